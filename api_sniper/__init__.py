@@ -4,7 +4,10 @@ API Sniper - A lightweight Python tool for reliably mimicking browser-initiated
 
 from .config import SniperConfig
 from .api_sniper import APISniper
+from .watcher import ChangeEvent, JsonChange
+from .outbox import Outbox
+from .response_processor import SchemaValidator
 
 __version__ = "0.1.0"
 __author__ = "0xEljh"
-__all__ = ["APISniper", "SniperConfig"]
+__all__ = ["APISniper", "SniperConfig", "ChangeEvent", "JsonChange", "Outbox", "SchemaValidator"]
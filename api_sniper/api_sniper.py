@@ -1,10 +1,13 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Iterator, Union
 import requests
 from .config import SniperConfig
 from .auth_manager import AuthManager
+from .exceptions import ConfigError, SniperError
 from .request_handler import RequestHandler
-from .response_processor import ResponseProcessor
+from .response_processor import ResponseProcessor, SchemaValidator
 from .utils import rotate_user_agent
+from .watcher import EndpointWatcher, ChangeEvent
+from .outbox import Outbox
 
 class APISniper:
     """Main class for making API requests that mimic browser behavior."""
@@ -17,6 +20,7 @@ class APISniper:
         self.auth = AuthManager(config, self.session)
         self.request_handler = RequestHandler(config, self.session)
         self.response_processor = ResponseProcessor()
+        self.outbox: Optional[Outbox] = None
         
         if config.user_agent_rotation and config.user_agents:
             self._rotate_user_agent()
@@ -34,55 +38,139 @@ class APISniper:
         """Manually set an authentication token."""
         self.auth.set_token(token, token_type)
     
+    def _process(
+        self,
+        response: requests.Response,
+        schema: Optional[Union[Dict, SchemaValidator]] = None
+    ) -> Any:
+        """Parse a response and validate the parsed body, decoding it only once."""
+        data = self.response_processor.process_response(response)
+        if schema is not None:
+            self.response_processor.validate_response(
+                response, data=data, schema=self.response_processor.compile_schema(schema)
+            )
+        return data
+    
     def get(
         self,
         endpoint: str,
         params: Optional[Dict] = None,
-        headers: Optional[Dict] = None
+        headers: Optional[Dict] = None,
+        schema: Optional[Union[Dict, SchemaValidator]] = None
     ) -> Any:
-        """Make a GET request."""
+        """Make a GET request, optionally validating the parsed body against a schema."""
         response = self.request_handler.make_request(
             "GET", endpoint, params=params, headers=headers
         )
-        return self.response_processor.process_response(response)
+        return self._process(response, schema)
+    
+    def stream(
+        self,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+        schema: Optional[Union[Dict, SchemaValidator]] = None
+    ) -> Iterator[Any]:
+        """Stream a newline-delimited JSON response, validating each record as it arrives."""
+        response = self.request_handler.make_request(
+            "GET", endpoint, params=params, headers=headers, stream=True
+        )
+        try:
+            records = self.response_processor.iter_json_lines(response)
+            if schema is not None:
+                records = self.response_processor.compile_schema(schema).iter_validate(records)
+            yield from records
+        finally:
+            response.close()
     
     def post(
         self,
         endpoint: str,
         json: Optional[Dict] = None,
         data: Optional[Dict] = None,
-        headers: Optional[Dict] = None
+        headers: Optional[Dict] = None,
+        schema: Optional[Union[Dict, SchemaValidator]] = None
     ) -> Any:
-        """Make a POST request."""
+        """Make a POST request, optionally validating the parsed body against a schema."""
         response = self.request_handler.make_request(
             "POST", endpoint, json=json, data=data, headers=headers
         )
-        return self.response_processor.process_response(response)
+        return self._process(response, schema)
     
     def put(
         self,
         endpoint: str,
         json: Optional[Dict] = None,
         data: Optional[Dict] = None,
-        headers: Optional[Dict] = None
+        headers: Optional[Dict] = None,
+        schema: Optional[Union[Dict, SchemaValidator]] = None
     ) -> Any:
-        """Make a PUT request."""
+        """Make a PUT request, optionally validating the parsed body against a schema."""
         response = self.request_handler.make_request(
             "PUT", endpoint, json=json, data=data, headers=headers
         )
-        return self.response_processor.process_response(response)
+        return self._process(response, schema)
     
     def delete(
         self,
         endpoint: str,
         params: Optional[Dict] = None,
-        headers: Optional[Dict] = None
+        headers: Optional[Dict] = None,
+        schema: Optional[Union[Dict, SchemaValidator]] = None
     ) -> Any:
-        """Make a DELETE request."""
+        """Make a DELETE request, optionally validating the parsed body against a schema."""
         response = self.request_handler.make_request(
             "DELETE", endpoint, params=params, headers=headers
         )
-        return self.response_processor.process_response(response)
+        return self._process(response, schema)
+    
+    def open_outbox(self, path: str, start: bool = True, **kwargs) -> Outbox:
+        """Open a durable outbox for queued writes, resuming any left from a crash."""
+        if self.outbox is not None and not self.outbox.closed:
+            if self.outbox.path != path:
+                raise ConfigError(
+                    f"An outbox is already open at {self.outbox.path}; close it before opening {path}"
+                )
+            if kwargs:
+                raise ConfigError(
+                    f"Outbox at {path} is already open; close it before changing its settings"
+                )
+        else:
+            self.outbox = Outbox(self.request_handler, path, **kwargs)
+            if start:
+                self.outbox.start()
+        return self.outbox
+    
+    def watch(
+        self,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+        min_interval: float = 1.0,
+        max_interval: float = 60.0,
+        backoff_factor: float = 2.0,
+        emit_initial: bool = True,
+        max_polls: Optional[int] = None,
+        on_error: Optional[Callable[[SniperError], None]] = None,
+        max_consecutive_errors: Optional[int] = None
+    ) -> Iterator[ChangeEvent]:
+        """Poll an endpoint and yield change events only when it changes."""
+        watcher = EndpointWatcher(
+            self.request_handler,
+            self.response_processor,
+            endpoint,
+            params=params,
+            headers=headers,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            backoff_factor=backoff_factor,
+            emit_initial=emit_initial
+        )
+        return watcher.watch(
+            max_polls=max_polls,
+            on_error=on_error,
+            max_consecutive_errors=max_consecutive_errors
+        )
     
     def record_request_pattern(
         self,
@@ -94,7 +182,11 @@ class APISniper:
         """Record a request pattern for later replay."""
         self.request_handler.record_request_pattern(pattern_name, method, url, **kwargs)
     
-    def replay_request(self, pattern_name: str) -> Any:
-        """Replay a recorded request pattern."""
+    def replay_request(
+        self,
+        pattern_name: str,
+        schema: Optional[Union[Dict, SchemaValidator]] = None
+    ) -> Any:
+        """Replay a recorded request pattern, optionally validating the parsed body."""
         response = self.request_handler.replay_request(pattern_name)
-        return self.response_processor.process_response(response)
+        return self._process(response, schema)
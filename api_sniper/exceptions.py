@@ -1,3 +1,5 @@
+from typing import Optional
+
 class SniperError(Exception):
     """Base exception for all API Sniper errors."""
     pass
@@ -8,7 +10,9 @@ class AuthError(SniperError):
 
 class RequestError(SniperError):
     """Raised when a request fails."""
-    pass
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
 
 class ResponseParseError(SniperError):
     """Raised when response parsing fails."""
@@ -17,3 +21,11 @@ class ResponseParseError(SniperError):
 class ConfigError(SniperError):
     """Raised when configuration is invalid."""
     pass
+
+class OutboxFullError(SniperError):
+    """Raised when the outbox is at capacity and cannot accept a write."""
+    pass
+
+class ValidationError(ResponseParseError):
+    """Raised when response data does not match the expected schema."""
+    pass
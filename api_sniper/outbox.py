@@ -0,0 +1,413 @@
+from typing import Optional, Dict, Any, List
+import json as jsonlib
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import requests
+from .exceptions import RequestError, OutboxFullError
+from .request_handler import RequestHandler
+
+logger = logging.getLogger(__name__)
+
+# Client errors that can succeed on a later attempt
+_RETRYABLE_CLIENT_ERRORS = {408, 429}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    method TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    json TEXT,
+    data TEXT,
+    headers TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    completed_at REAL,
+    claimed_by TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_ready ON outbox (status, next_attempt_at);
+"""
+
+_RESET_FAILED = (
+    "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = 0, "
+    "last_error = NULL, created_at = ? WHERE status = 'failed'"
+)
+
+def _is_transient(error: RequestError) -> bool:
+    """Whether a failed send may succeed later: connection errors, 5xx, 408 and 429."""
+    status = error.status_code
+    return status is None or status >= 500 or status in _RETRYABLE_CLIENT_ERRORS
+
+class Outbox:
+    """Durable SQLite-backed write queue drained by a background worker pool.
+
+    Each write is sent once per attempt; the outbox's own capped exponential
+    backoff is the only retry policy. Transient failures (connection errors,
+    5xx, 408, 429) are retried until a write has been queued for
+    ``max_retry_time`` seconds; other 4xx responses fail immediately. Failed
+    writes are kept and can be listed with ``failed()`` and re-driven with
+    ``retry_failed()`` or by enqueueing the same idempotency key again.
+
+    Workers claim writes with a lease of ``lease_timeout`` seconds, so several
+    outboxes may share one file: a write is only reclaimed (and resent under
+    its idempotency key) once its lease has expired, e.g. after a crash.
+    Delivered rows are kept for ``retention`` seconds so that re-enqueueing the
+    same key within that window is a no-op, then deleted.
+
+    Each worker thread sends through its own ``requests.Session``, seeded
+    with the caller's headers, cookies and auth before every batch.
+    """
+
+    def __init__(
+        self,
+        request_handler: RequestHandler,
+        path: str,
+        workers: int = 2,
+        batch_size: int = 10,
+        max_pending: int = 1000,
+        max_retry_time: float = 86400.0,
+        retry_backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        lease_timeout: Optional[float] = None,
+        poll_interval: float = 0.5,
+        retention: float = 86400.0
+    ):
+        self.request_handler = request_handler
+        self.path = path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_retry_time = max_retry_time
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        # Long enough for a whole batch of sends to time out before anyone reclaims it
+        self.lease_timeout = lease_timeout or batch_size * request_handler.config.timeout + 30
+        self.poll_interval = poll_interval
+        self.retention = retention
+
+        self._owner = str(uuid.uuid4())
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._closed = False
+        self._last_purge = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Whether background workers are draining the outbox."""
+        return bool(self._threads) and not self._stopping
+
+    def _count(self, *statuses: str) -> int:
+        """Count queued writes in the given statuses. Caller holds the lock."""
+        placeholders = ", ".join("?" for _ in statuses)
+        row = self._conn.execute(
+            f"SELECT COUNT(*) FROM outbox WHERE status IN ({placeholders})", statuses
+        ).fetchone()
+        return row[0]
+
+    def enqueue(
+        self,
+        method: str,
+        endpoint: str,
+        json: Optional[Dict] = None,
+        data: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+        idempotency_key: Optional[str] = None,
+        block: bool = True,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Durably queue a write and return its idempotency key.
+
+        Enqueueing a key that is already queued or delivered is a no-op; a key
+        whose write previously failed is queued again. When the outbox is full
+        this waits for space (up to ``timeout``) while workers are running and
+        raises OutboxFullError otherwise.
+        """
+        key = idempotency_key or str(uuid.uuid4())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._count("pending", "in_flight") >= self.max_pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or not self.running or (remaining is not None and remaining <= 0):
+                    raise OutboxFullError(
+                        f"Outbox has {self.max_pending} pending writes, cannot enqueue {method} {endpoint}"
+                    )
+                self._cond.wait(remaining if remaining is not None else self.poll_interval)
+
+            now = time.time()
+            self._conn.execute(
+                "INSERT INTO outbox "
+                "(idempotency_key, method, endpoint, json, data, headers, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (idempotency_key) DO UPDATE SET "
+                "status = 'pending', attempts = 0, next_attempt_at = 0, last_error = NULL, "
+                "created_at = excluded.created_at WHERE outbox.status = 'failed'",
+                (
+                    key,
+                    method,
+                    endpoint,
+                    jsonlib.dumps(json) if json is not None else None,
+                    jsonlib.dumps(data) if data is not None else None,
+                    jsonlib.dumps(headers) if headers is not None else None,
+                    now,
+                )
+            )
+            self._cond.notify_all()
+        return key
+
+    def post(self, endpoint: str, json: Optional[Dict] = None, data: Optional[Dict] = None,
+             headers: Optional[Dict] = None, idempotency_key: Optional[str] = None,
+             block: bool = True, timeout: Optional[float] = None) -> str:
+        """Queue a POST request."""
+        return self.enqueue("POST", endpoint, json=json, data=data, headers=headers,
+                            idempotency_key=idempotency_key, block=block, timeout=timeout)
+
+    def put(self, endpoint: str, json: Optional[Dict] = None, data: Optional[Dict] = None,
+            headers: Optional[Dict] = None, idempotency_key: Optional[str] = None,
+            block: bool = True, timeout: Optional[float] = None) -> str:
+        """Queue a PUT request."""
+        return self.enqueue("PUT", endpoint, json=json, data=data, headers=headers,
+                            idempotency_key=idempotency_key, block=block, timeout=timeout)
+
+    def failed(self) -> List[Dict[str, Any]]:
+        """List writes that gave up, oldest first."""
+        with self._cond:
+            rows = self._conn.execute(
+                "SELECT idempotency_key, method, endpoint, attempts, last_error "
+                "FROM outbox WHERE status = 'failed' ORDER BY id"
+            ).fetchall()
+        return [
+            {"idempotency_key": key, "method": method, "endpoint": endpoint,
+             "attempts": attempts, "last_error": last_error}
+            for key, method, endpoint, attempts, last_error in rows
+        ]
+
+    def retry_failed(self, idempotency_keys: Optional[List[str]] = None) -> int:
+        """Queue failed writes again (all, or only the given keys). Returns how many."""
+        with self._cond:
+            if idempotency_keys is None:
+                cursor = self._conn.execute(_RESET_FAILED, (time.time(),))
+                count = cursor.rowcount
+            else:
+                count = 0
+                for key in idempotency_keys:
+                    cursor = self._conn.execute(
+                        _RESET_FAILED + " AND idempotency_key = ?", (time.time(), key)
+                    )
+                    count += cursor.rowcount
+            self._cond.notify_all()
+        return count
+
+    def _claim_batch(self) -> List[tuple]:
+        """Atomically lease a batch of ready writes to this outbox. Caller holds the lock."""
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._conn.execute(
+                "SELECT id, idempotency_key, method, endpoint, json, data, headers, attempts, "
+                "created_at FROM outbox "
+                "WHERE (status = 'pending' AND next_attempt_at <= ?) "
+                "OR (status = 'in_flight' AND lease_expires_at <= ?) "
+                "ORDER BY id LIMIT ?",
+                (now, now, self.batch_size)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'in_flight', claimed_by = ?, lease_expires_at = ? "
+                "WHERE id = ?",
+                [(self._owner, now + self.lease_timeout, row[0]) for row in rows]
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _new_handler(self) -> RequestHandler:
+        """Build a request handler with a session private to one worker thread."""
+        return RequestHandler(self.request_handler.config, requests.Session())
+
+    def _sync_session(self, session: requests.Session) -> None:
+        """Copy the caller's headers, cookies and auth onto a worker session."""
+        source = self.request_handler.session
+        session.headers = source.headers.copy()
+        session.cookies = source.cookies.copy()
+        session.auth = source.auth
+
+    def _send(self, handler: RequestHandler, row: tuple) -> Optional[RequestError]:
+        """Send a single queued write once, returning the error on failure."""
+        _, key, method, endpoint, json, data, headers = row[:7]
+        request_headers = jsonlib.loads(headers) if headers else {}
+        request_headers["Idempotency-Key"] = key
+        try:
+            handler.send_request(
+                method,
+                endpoint,
+                json=jsonlib.loads(json) if json else None,
+                data=jsonlib.loads(data) if data else None,
+                headers=request_headers
+            )
+        except RequestError as e:
+            return e
+        return None
+
+    def _backoff(self, attempts: int) -> float:
+        """Delay before the next attempt, doubling per attempt up to max_backoff."""
+        return min(self.retry_backoff * 2 ** min(attempts - 1, 32), self.max_backoff)
+
+    def _record_results(self, results: List[tuple]) -> None:
+        """Persist the outcome of a sent batch. Caller holds the lock."""
+        done, retry, failed = [], [], []
+        now = time.time()
+        for row, error in results:
+            row_id, attempts, created_at = row[0], row[7] + 1, row[8]
+            if error is None:
+                done.append((attempts, now, row_id, self._owner))
+            elif _is_transient(error) and now - created_at < self.max_retry_time:
+                retry.append((attempts, str(error), now + self._backoff(attempts), row_id, self._owner))
+            else:
+                failed.append((attempts, str(error), row_id, self._owner))
+
+        # Rows whose lease expired and were reclaimed elsewhere are left to the new owner
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'done', attempts = ?, last_error = NULL, "
+                "completed_at = ?, claimed_by = NULL WHERE id = ? AND claimed_by = ?", done
+            )
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'failed', attempts = ?, last_error = ?, "
+                "claimed_by = NULL WHERE id = ? AND claimed_by = ?", failed
+            )
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'pending', attempts = ?, last_error = ?, "
+                "next_attempt_at = ?, claimed_by = NULL WHERE id = ? AND claimed_by = ?", retry
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _purge(self) -> None:
+        """Delete delivered rows older than the retention window. Caller holds the lock."""
+        now = time.time()
+        if now - self._last_purge < min(self.retention, 60.0):
+            return
+        self._last_purge = now
+        self._conn.execute(
+            "DELETE FROM outbox WHERE status = 'done' AND completed_at <= ?",
+            (now - self.retention,)
+        )
+
+    def _requeue(self, rows: List[tuple]) -> None:
+        """Return claimed rows to the queue after an unexpected error. Caller holds the lock."""
+        try:
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'pending', claimed_by = NULL "
+                "WHERE id = ? AND status = 'in_flight' AND claimed_by = ?",
+                [(row[0], self._owner) for row in rows]
+            )
+        except Exception:
+            logger.exception("Failed to requeue %d outbox writes", len(rows))
+
+    def _worker(self) -> None:
+        """Drain the outbox until stopped."""
+        handler = self._new_handler()
+        while True:
+            rows: List[tuple] = []
+            try:
+                with self._cond:
+                    if self._stopping:
+                        return
+                    rows = self._claim_batch()
+                    if not rows:
+                        self._purge()
+                        self._cond.wait(self.poll_interval)
+                        continue
+
+                self._sync_session(handler.session)
+                results = [(row, self._send(handler, row)) for row in rows]
+
+                with self._cond:
+                    self._record_results(results)
+                    self._purge()
+                    self._cond.notify_all()
+            except Exception:
+                logger.exception("Outbox worker error, requeueing %d writes", len(rows))
+                with self._cond:
+                    if rows:
+                        self._requeue(rows)
+                    self._cond.notify_all()
+                    self._cond.wait(self.poll_interval)
+
+    def start(self) -> None:
+        """Start the background drain workers."""
+        if self._threads:
+            return
+        self._stopping = False
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"outbox-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers after their current batch completes."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no writes are pending or in flight.
+
+        Returns False on timeout, or straight away if writes remain and no
+        workers are running to drain them.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._count("pending", "in_flight"):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not self.running or (remaining is not None and remaining <= 0):
+                    return False
+                self._cond.wait(remaining if remaining is not None else self.poll_interval)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of queued writes by status."""
+        with self._cond:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM outbox GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the outbox has been closed."""
+        return self._closed
+
+    def close(self) -> None:
+        """Stop the workers and close the database."""
+        if self._closed:
+            return
+        self.stop()
+        self._conn.close()
+        self._closed = True
+
+    def __enter__(self) -> "Outbox":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
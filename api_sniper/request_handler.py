@@ -40,8 +40,26 @@ class RequestHandler:
         data: Optional[Dict] = None,
         headers: Optional[Dict] = None,
         timeout: Optional[int] = None,
+        stream: bool = False,
     ) -> requests.Response:
         """Make an HTTP request with retry logic."""
+        return self.send_request(
+            method, endpoint, params=params, json=json, data=data,
+            headers=headers, timeout=timeout, stream=stream
+        )
+    
+    def send_request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        json: Optional[Dict] = None,
+        data: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+        timeout: Optional[int] = None,
+        stream: bool = False,
+    ) -> requests.Response:
+        """Make a single HTTP request without retrying."""
         try:
             url = f"{self.config.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
             response = self.session.request(
@@ -54,12 +72,17 @@ class RequestHandler:
                 timeout=timeout or self.config.timeout,
                 verify=self.config.verify_ssl,
                 proxies=self.config.proxies,
-                allow_redirects=True
+                allow_redirects=True,
+                stream=stream
             )
             response.raise_for_status()
             return response
         except requests.exceptions.RequestException as e:
-            raise RequestError(f"Request failed: {str(e)}")
+            status_code = e.response.status_code if e.response is not None else None
+            if stream and e.response is not None:
+                # Streamed bodies hold their connection until closed
+                e.response.close()
+            raise RequestError(f"Request failed: {str(e)}", status_code=status_code)
     
     def record_request_pattern(
         self,
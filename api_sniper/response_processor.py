@@ -1,11 +1,162 @@
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from collections import OrderedDict
 import json
+import threading
 from requests import Response
-from .exceptions import ResponseParseError
+from requests.exceptions import RequestException
+from .exceptions import RequestError, ResponseParseError, ValidationError
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+Check = Callable[[Any, Tuple[Any, ...]], None]
+
+# Marks validate_response data that has not been parsed yet, since a parsed
+# JSON body may legitimately be None.
+_UNPARSED = object()
+
+_CACHE_SIZE = 128
+
+_SUPPORTED_KEYWORDS = {"type", "required", "properties", "items"}
+# Annotations that never affect validation
+_IGNORED_KEYWORDS = {"$schema", "$id", "$comment", "title", "description", "examples", "default"}
+
+def _format_path(path: Tuple[Any, ...]) -> str:
+    """Render a value path like $.data.items[0].id for error messages."""
+    return "$" + "".join(f"[{part}]" if isinstance(part, int) else f".{part}" for part in path)
+
+def _compile(schema: Dict[str, Any]) -> Check:
+    """Compile a schema node into a single check function."""
+    unsupported = sorted(set(schema) - _SUPPORTED_KEYWORDS - _IGNORED_KEYWORDS)
+    if unsupported:
+        raise ValueError(f"Unsupported schema keyword(s): {', '.join(unsupported)}")
+    checks: List[Check] = []
+
+    if "type" in schema:
+        names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        unknown = [name for name in names if name not in _TYPE_CHECKS]
+        if unknown:
+            raise ValueError(f"Unknown schema type(s): {', '.join(unknown)}")
+        type_checks = [_TYPE_CHECKS[name] for name in names]
+        expected = " or ".join(names)
+
+        def check_type(value, path):
+            if not any(type_check(value) for type_check in type_checks):
+                raise ValidationError(
+                    f"{_format_path(path)}: expected {expected}, got {type(value).__name__}"
+                )
+        checks.append(check_type)
+
+    required = list(schema.get("required", []))
+    if required:
+        def check_required(value, path):
+            if isinstance(value, dict):
+                missing = [name for name in required if name not in value]
+                if missing:
+                    raise ValidationError(
+                        f"{_format_path(path)}: missing required fields: {', '.join(missing)}"
+                    )
+        checks.append(check_required)
+
+    properties = [(name, _compile(sub)) for name, sub in schema.get("properties", {}).items()]
+    if properties:
+        def check_properties(value, path):
+            if isinstance(value, dict):
+                for name, check in properties:
+                    if name in value:
+                        check(value[name], path + (name,))
+        checks.append(check_properties)
+
+    if "items" in schema:
+        check_item = _compile(schema["items"])
+
+        def check_items(value, path):
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    check_item(item, path + (index,))
+        checks.append(check_items)
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value, path):
+        for check in checks:
+            check(value, path)
+    return check_all
+
+class SchemaValidator:
+    """A schema compiled once into a validator for already-parsed JSON data.
+
+    Supports a JSON Schema subset: ``type`` (a name or list of names),
+    ``required``, ``properties`` and ``items``, nested to any depth. Other
+    validation keywords raise ValueError rather than being silently ignored.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._check = _compile(schema)
+        types = schema.get("type")
+        if "items" in schema:
+            self._check_item = _compile(schema["items"])
+        elif "array" in (types if isinstance(types, list) else [types]):
+            # An array of anything: records themselves are unconstrained
+            self._check_item = lambda value, path: None
+        else:
+            self._check_item = self._check
+
+    def validate(self, data: Any) -> Any:
+        """Validate parsed data, returning it unchanged."""
+        self._check(data, ())
+        return data
+
+    def iter_validate(self, records: Iterable[Any]) -> Iterator[Any]:
+        """Validate records one at a time as they arrive.
+
+        Records are checked against the schema's ``items`` when it describes
+        an array (any record passes if it has none), otherwise against the
+        schema itself.
+        """
+        for index, record in enumerate(records):
+            self._check_item(record, (index,))
+            yield record
+
+_validators: "OrderedDict[str, SchemaValidator]" = OrderedDict()
+_validators_lock = threading.Lock()
+
+def compile_schema(schema: Union[Dict[str, Any], SchemaValidator]) -> SchemaValidator:
+    """Return a compiled validator for a schema, reusing earlier compilations.
+
+    Dict schemas are cached by their canonical JSON in a small LRU, so a
+    schema edited after first use is recompiled. On hot paths, build a
+    SchemaValidator once and pass that instead to skip the lookup.
+    """
+    if isinstance(schema, SchemaValidator):
+        return schema
+    key = json.dumps(schema, sort_keys=True)
+    with _validators_lock:
+        validator = _validators.get(key)
+        if validator is not None:
+            _validators.move_to_end(key)
+            return validator
+    validator = SchemaValidator(schema)
+    with _validators_lock:
+        _validators[key] = validator
+        while len(_validators) > _CACHE_SIZE:
+            _validators.popitem(last=False)
+    return validator
 
 class ResponseProcessor:
     """Processes and validates HTTP responses."""
     
+    compile_schema = staticmethod(compile_schema)
+    
     @staticmethod
     def process_response(response: Response) -> Any:
         """Process response and return parsed data."""
@@ -23,25 +174,54 @@ class ResponseProcessor:
         except Exception as e:
             raise ResponseParseError(f"Failed to process response: {str(e)}")
     
+    @staticmethod
+    def iter_json_lines(response: Response) -> Iterator[Any]:
+        """Parse a streamed newline-delimited JSON response one record at a time."""
+        try:
+            for line in response.iter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ResponseParseError(f"Failed to parse JSON record: {str(e)}")
+        except RequestException as e:
+            raise RequestError(f"Stream failed: {str(e)}")
+    
     @staticmethod
     def validate_response(
         response: Response,
         expected_status: Optional[int] = None,
-        required_fields: Optional[list] = None
+        required_fields: Optional[list] = None,
+        data: Any = _UNPARSED,
+        schema: Optional[Union[Dict[str, Any], SchemaValidator]] = None
     ) -> None:
-        """Validate response status and content."""
+        """Validate response status and content.
+        
+        Pass the already-parsed ``data`` to avoid decoding the body again.
+        """
         if expected_status and response.status_code != expected_status:
             raise ResponseParseError(
                 f"Unexpected status code: {response.status_code}, expected: {expected_status}"
             )
-            
-        if required_fields:
+        
+        if not required_fields and schema is None:
+            return
+        
+        if data is _UNPARSED:
             try:
                 data = response.json()
-                missing_fields = [field for field in required_fields if field not in data]
-                if missing_fields:
-                    raise ResponseParseError(
-                        f"Response missing required fields: {', '.join(missing_fields)}"
-                    )
             except json.JSONDecodeError:
                 raise ResponseParseError("Response is not valid JSON")
+        
+        if required_fields:
+            if not isinstance(data, dict):
+                raise ResponseParseError("Response is not a JSON object")
+            missing_fields = [field for field in required_fields if field not in data]
+            if missing_fields:
+                raise ResponseParseError(
+                    f"Response missing required fields: {', '.join(missing_fields)}"
+                )
+        
+        if schema is not None:
+            compile_schema(schema).validate(data)
@@ -0,0 +1,181 @@
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Callable, List, Tuple, Iterator
+import hashlib
+import time
+from .exceptions import ConfigError, RequestError, ResponseParseError, SniperError
+from .request_handler import RequestHandler
+from .response_processor import ResponseProcessor
+
+@dataclass
+class JsonChange:
+    """A single structural difference between two JSON payloads."""
+    op: str  # "add", "remove" or "replace"
+    path: Tuple[Any, ...]
+    old: Any = None
+    new: Any = None
+
+@dataclass
+class ChangeEvent:
+    """Emitted by a watcher whenever the watched resource changes."""
+    endpoint: str
+    data: Any
+    previous: Any
+    changes: List[JsonChange] = field(default_factory=list)
+    timestamp: float = field(default_factory=time.time)
+
+def diff_json(old: Any, new: Any, path: Tuple[Any, ...] = ()) -> List[JsonChange]:
+    """Compute the structural differences between two parsed JSON values."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in old:
+            if key not in new:
+                changes.append(JsonChange("remove", path + (key,), old=old[key]))
+            else:
+                changes.extend(diff_json(old[key], new[key], path + (key,)))
+        for key in new:
+            if key not in old:
+                changes.append(JsonChange("add", path + (key,), new=new[key]))
+        return changes
+
+    if isinstance(old, list) and isinstance(new, list):
+        changes = []
+        common = min(len(old), len(new))
+        for index in range(common):
+            changes.extend(diff_json(old[index], new[index], path + (index,)))
+        for index in range(common, len(old)):
+            changes.append(JsonChange("remove", path + (index,), old=old[index]))
+        for index in range(common, len(new)):
+            changes.append(JsonChange("add", path + (index,), new=new[index]))
+        return changes
+
+    # bool is an int subclass, so compare types too to catch True -> 1
+    if type(old) is not type(new) or old != new:
+        return [JsonChange("replace", path, old=old, new=new)]
+    return []
+
+class EndpointWatcher:
+    """Polls an endpoint with conditional requests and yields only changes."""
+
+    def __init__(
+        self,
+        request_handler: RequestHandler,
+        response_processor: ResponseProcessor,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+        min_interval: float = 1.0,
+        max_interval: float = 60.0,
+        backoff_factor: float = 2.0,
+        emit_initial: bool = True
+    ):
+        if min_interval <= 0:
+            raise ConfigError(f"min_interval must be positive, got {min_interval}")
+        if max_interval < min_interval:
+            raise ConfigError(
+                f"max_interval ({max_interval}) must be at least min_interval ({min_interval})"
+            )
+        if backoff_factor < 1:
+            raise ConfigError(f"backoff_factor must be at least 1, got {backoff_factor}")
+
+        self.request_handler = request_handler
+        self.response_processor = response_processor
+        self.endpoint = endpoint
+        self.params = params
+        self.headers = headers or {}
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.emit_initial = emit_initial
+
+        self.interval = min_interval
+        self.data: Any = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._digest: Optional[bytes] = None
+        self._polled = False
+
+    def _conditional_headers(self) -> Dict[str, str]:
+        """Build request headers including any validators from the last response."""
+        headers = dict(self.headers)
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+        return headers
+
+    def _adjust_interval(self, changed: bool) -> None:
+        """Reset the interval on change, back off while the resource is stable."""
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff_factor, self.max_interval)
+
+    def poll(self) -> Optional[ChangeEvent]:
+        """Poll the endpoint once, returning a change event if the resource changed."""
+        response = self.request_handler.make_request(
+            "GET", self.endpoint, params=self.params, headers=self._conditional_headers()
+        )
+        first_poll = not self._polled
+        self._polled = True
+
+        if response.status_code == 304:
+            self._adjust_interval(False)
+            return None
+
+        # Servers without validators still let us skip parsing identical bodies
+        digest = hashlib.blake2b(response.content, digest_size=16).digest()
+        if digest == self._digest:
+            self._etag = response.headers.get("ETag")
+            self._last_modified = response.headers.get("Last-Modified")
+            self._adjust_interval(False)
+            return None
+
+        # Only remember this response once it has parsed, so a bad body is refetched
+        data = self.response_processor.process_response(response)
+        self._digest = digest
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+
+        previous = self.data
+        self.data = data
+        changes = diff_json(previous, self.data)
+        if not first_poll and not changes:
+            self._adjust_interval(False)
+            return None
+
+        self._adjust_interval(True)
+        if first_poll and not self.emit_initial:
+            return None
+        return ChangeEvent(self.endpoint, self.data, previous, changes)
+
+    def watch(
+        self,
+        max_polls: Optional[int] = None,
+        on_error: Optional[Callable[[SniperError], None]] = None,
+        max_consecutive_errors: Optional[int] = None
+    ) -> Iterator[ChangeEvent]:
+        """Poll until max_polls is reached (forever if None), yielding changes.
+
+        Failed polls (request or parse errors) back off like unchanged ones
+        and are passed to on_error; the error is only raised once
+        max_consecutive_errors is exceeded.
+        """
+        polls = 0
+        errors = 0
+        while max_polls is None or polls < max_polls:
+            try:
+                event = self.poll()
+                errors = 0
+            except (RequestError, ResponseParseError) as e:
+                errors += 1
+                if max_consecutive_errors is not None and errors > max_consecutive_errors:
+                    raise
+                if on_error:
+                    on_error(e)
+                self._adjust_interval(False)
+                event = None
+            polls += 1
+            if event is not None:
+                yield event
+            if max_polls is None or polls < max_polls:
+                time.sleep(self.interval)
@@ -1,9 +1,16 @@
 import pytest
+import requests
 import responses
 import json
+import sqlite3
+import time
 from urllib.parse import unquote
-from api_sniper import APISniper, SniperConfig
-from api_sniper.exceptions import AuthError, RequestError
+from api_sniper import APISniper, SniperConfig, SchemaValidator
+from api_sniper.exceptions import (
+    AuthError, ConfigError, RequestError, OutboxFullError, ResponseParseError, ValidationError
+)
+from api_sniper.response_processor import ResponseProcessor
+from api_sniper.watcher import diff_json
 
 
 @pytest.fixture
@@ -267,3 +274,479 @@ def test_x_user_by_screen_name(x_sniper):
     assert "variables" in request.url
     assert "features" in request.url
     assert "fieldToggles" in request.url
+
+@responses.activate
+def test_watch_emits_only_changes(sniper, monkeypatch):
+    """Test that watch uses conditional requests and yields only changes."""
+    sleeps = []
+    monkeypatch.setattr("api_sniper.watcher.time.sleep", sleeps.append)
+    
+    responses.add(
+        responses.GET,
+        "https://api.example.com/api/status",
+        json={"state": "pending", "items": [1]},
+        headers={"ETag": '"v1"'},
+        status=200
+    )
+    responses.add(responses.GET, "https://api.example.com/api/status", status=304)
+    responses.add(
+        responses.GET,
+        "https://api.example.com/api/status",
+        json={"state": "pending", "items": [1]},
+        headers={"ETag": '"v1"'},
+        status=200
+    )
+    responses.add(
+        responses.GET,
+        "https://api.example.com/api/status",
+        json={"state": "done", "items": [1, 2]},
+        headers={"ETag": '"v2"'},
+        status=200
+    )
+    
+    events = list(sniper.watch(
+        "/api/status", min_interval=1.0, max_interval=3.0, max_polls=4
+    ))
+    
+    # Initial snapshot plus one real change
+    assert len(events) == 2
+    assert events[0].data == {"state": "pending", "items": [1]}
+    assert events[1].previous == events[0].data
+    assert [(c.op, c.path, c.old, c.new) for c in events[1].changes] == [
+        ("replace", ("state",), "pending", "done"),
+        ("add", ("items", 1), None, 2),
+    ]
+    
+    # Validators are sent back after the first response
+    assert "If-None-Match" not in responses.calls[0].request.headers
+    assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+    
+    # Interval backs off while stable, capped at max_interval
+    assert sleeps == [1.0, 2.0, 3.0]
+
+@responses.activate
+def test_watch_survives_failed_poll(sniper, monkeypatch):
+    """Test that a failed poll backs off and the watch keeps going."""
+    monkeypatch.setattr("api_sniper.watcher.time.sleep", lambda seconds: None)
+    
+    responses.add(responses.GET, "https://api.example.com/api/status", json={"n": 1}, status=200)
+    # make_request retries three times before the poll itself fails
+    for _ in range(3):
+        responses.add(responses.GET, "https://api.example.com/api/status", status=503)
+    responses.add(responses.GET, "https://api.example.com/api/status", json={"n": 2}, status=200)
+    
+    errors = []
+    events = list(sniper.watch("/api/status", max_polls=3, on_error=errors.append))
+    
+    assert [event.data for event in events] == [{"n": 1}, {"n": 2}]
+    assert len(errors) == 1 and isinstance(errors[0], RequestError)
+
+@responses.activate
+def test_watch_raises_after_max_consecutive_errors(sniper, monkeypatch):
+    """Test that persistent failures still end the watch when a limit is set."""
+    monkeypatch.setattr("api_sniper.watcher.time.sleep", lambda seconds: None)
+    responses.add(responses.GET, "https://api.example.com/api/status", status=503)
+    
+    with pytest.raises(RequestError):
+        list(sniper.watch("/api/status", max_polls=5, max_consecutive_errors=1))
+    assert len(responses.calls) == 6
+
+@responses.activate
+def test_watch_survives_malformed_body(sniper, monkeypatch):
+    """Test that a truncated JSON body is reported and refetched, not remembered."""
+    monkeypatch.setattr("api_sniper.watcher.time.sleep", lambda seconds: None)
+    
+    responses.add(
+        responses.GET,
+        "https://api.example.com/api/status",
+        body='{"n": 1',
+        content_type="application/json",
+        headers={"ETag": '"bad"'},
+        status=200
+    )
+    responses.add(
+        responses.GET,
+        "https://api.example.com/api/status",
+        json={"n": 1},
+        status=200
+    )
+    
+    errors = []
+    events = list(sniper.watch("/api/status", max_polls=2, on_error=errors.append))
+    
+    assert [event.data for event in events] == [{"n": 1}]
+    assert len(errors) == 1 and isinstance(errors[0], ResponseParseError)
+    # The failed body's validator is not sent back
+    assert "If-None-Match" not in responses.calls[1].request.headers
+
+@responses.activate
+def test_watch_drops_validators_missing_from_latest_response(sniper, monkeypatch):
+    """Test that an ETag is no longer sent once the server stops returning one."""
+    monkeypatch.setattr("api_sniper.watcher.time.sleep", lambda seconds: None)
+    
+    responses.add(
+        responses.GET,
+        "https://api.example.com/api/status",
+        json={"n": 1},
+        headers={"ETag": '"v1"'},
+        status=200
+    )
+    responses.add(responses.GET, "https://api.example.com/api/status", json={"n": 2}, status=200)
+    responses.add(responses.GET, "https://api.example.com/api/status", json={"n": 2}, status=200)
+    
+    list(sniper.watch("/api/status", max_polls=3))
+    
+    assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+    assert "If-None-Match" not in responses.calls[2].request.headers
+
+@pytest.mark.parametrize("settings", [
+    {"min_interval": 0},
+    {"min_interval": 5, "max_interval": 1},
+    {"backoff_factor": 0.5},
+])
+def test_watch_rejects_invalid_intervals(sniper, settings):
+    """Test that interval settings that would never back off are rejected."""
+    with pytest.raises(ConfigError):
+        sniper.watch("/api/status", **settings)
+
+def test_diff_json_type_change():
+    """Test that structural diffs distinguish values of different types."""
+    changes = diff_json({"a": True, "b": {"c": 1}}, {"a": 1, "b": {}})
+    assert [(c.op, c.path) for c in changes] == [
+        ("replace", ("a",)),
+        ("remove", ("b", "c")),
+    ]
+
+@responses.activate
+def test_outbox_drains_and_deduplicates(sniper, tmp_path):
+    """Test that queued writes are sent once each with their idempotency key."""
+    responses.add(
+        responses.POST,
+        "https://api.example.com/api/orders",
+        json={"status": "created"},
+        status=201
+    )
+    
+    outbox = sniper.open_outbox(str(tmp_path / "outbox.db"), workers=2, batch_size=2)
+    keys = [outbox.post("/api/orders", json={"n": n}) for n in range(3)]
+    # Re-enqueueing with an existing key is a no-op
+    outbox.post("/api/orders", json={"n": 0}, idempotency_key=keys[0])
+    
+    assert outbox.flush(timeout=5)
+    assert outbox.stats() == {"done": 3}
+    outbox.close()
+    
+    sent = sorted(call.request.headers["Idempotency-Key"] for call in responses.calls)
+    assert sent == sorted(keys)
+
+@responses.activate
+def test_outbox_backpressure(sniper, tmp_path):
+    """Test that a full outbox rejects writes instead of growing unbounded."""
+    outbox = sniper.open_outbox(str(tmp_path / "outbox.db"), start=False, max_pending=1)
+    outbox.post("/api/orders", json={"n": 1})
+    
+    with pytest.raises(OutboxFullError):
+        outbox.post("/api/orders", json={"n": 2}, block=False)
+    # Without workers nothing will make room, so blocking would never return
+    with pytest.raises(OutboxFullError):
+        outbox.post("/api/orders", json={"n": 2})
+    assert not outbox.flush()
+    outbox.close()
+
+@responses.activate
+def test_outbox_resumes_after_crash(config, tmp_path):
+    """Test that writes whose lease expired with a dead process are resent."""
+    responses.add(
+        responses.PUT,
+        "https://api.example.com/api/items/1",
+        json={"status": "updated"},
+        status=200
+    )
+    path = str(tmp_path / "outbox.db")
+    
+    crashed = APISniper(config).open_outbox(path, start=False)
+    key = crashed.put("/api/items/1", json={"name": "widget"})
+    crashed.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "UPDATE outbox SET status = 'in_flight', claimed_by = 'dead', lease_expires_at = 0"
+        )
+    
+    outbox = APISniper(config).open_outbox(path)
+    assert outbox.flush(timeout=5)
+    assert outbox.stats() == {"done": 1}
+    outbox.close()
+    
+    assert len(responses.calls) == 1
+    assert responses.calls[0].request.headers["Idempotency-Key"] == key
+    assert responses.calls[0].request.body == b'{"name": "widget"}'
+
+@responses.activate
+def test_outbox_leaves_live_leases_alone(config, tmp_path):
+    """Test that a second outbox on the same file does not resend claimed writes."""
+    responses.add(responses.PUT, "https://api.example.com/api/items/1", status=200)
+    path = str(tmp_path / "outbox.db")
+    
+    first = APISniper(config).open_outbox(path, start=False)
+    first.put("/api/items/1", json={"name": "widget"})
+    first.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "UPDATE outbox SET status = 'in_flight', claimed_by = 'other', lease_expires_at = ?",
+            (time.time() + 60,)
+        )
+    
+    second = APISniper(config).open_outbox(path, poll_interval=0.05)
+    assert not second.flush(timeout=0.3)
+    assert second.stats() == {"in_flight": 1}
+    second.close()
+    
+    assert len(responses.calls) == 0
+
+@responses.activate
+def test_get_with_schema_validation(sniper):
+    """Test nested schema validation of a parsed GET response."""
+    schema = {
+        "type": "object",
+        "required": ["data"],
+        "properties": {
+            "data": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "required": ["id"],
+                    "properties": {"id": {"type": "integer"}, "tags": {"type": ["array", "null"]}}
+                }
+            }
+        }
+    }
+    responses.add(
+        responses.GET,
+        "https://api.example.com/api/items",
+        json={"data": [{"id": 1, "tags": None}, {"id": 2, "tags": ["a"]}]},
+        status=200
+    )
+    responses.add(
+        responses.GET,
+        "https://api.example.com/api/items",
+        json={"data": [{"id": 1}, {"id": "2"}]},
+        status=200
+    )
+    
+    assert sniper.get("/api/items", schema=schema)["data"][1]["id"] == 2
+    
+    with pytest.raises(ValidationError, match=r"\$\.data\[1\]\.id: expected integer, got str"):
+        sniper.get("/api/items", schema=schema)
+    
+    # The schema is compiled once and reused
+    assert sniper.response_processor.compile_schema(schema) is \
+        sniper.response_processor.compile_schema(schema)
+
+@responses.activate
+def test_stream_validates_records_incrementally(sniper):
+    """Test that streamed records are yielded until an invalid one arrives."""
+    responses.add(
+        responses.GET,
+        "https://api.example.com/api/events",
+        body=b'{"id": 1}\n{"id": 2}\n\n{"name": "no id"}\n{"id": 4}\n',
+        content_type="application/x-ndjson",
+        status=200
+    )
+    schema = {"type": "array", "items": {"type": "object", "required": ["id"]}}
+    
+    seen = []
+    with pytest.raises(ValidationError, match="missing required fields: id"):
+        for record in sniper.stream("/api/events", schema=schema):
+            seen.append(record["id"])
+    
+    assert seen == [1, 2]
+
+@responses.activate
+def test_outbox_client_error_fails_without_retry(sniper, tmp_path):
+    """Test that a 4xx write is sent once and marked failed."""
+    responses.add(responses.POST, "https://api.example.com/api/orders", status=400)
+    
+    outbox = sniper.open_outbox(str(tmp_path / "outbox.db"))
+    outbox.post("/api/orders", json={"n": 1})
+    assert outbox.flush(timeout=5)
+    assert outbox.stats() == {"failed": 1}
+    outbox.close()
+    
+    assert len(responses.calls) == 1
+
+@responses.activate
+def test_outbox_purges_delivered_writes(sniper, tmp_path):
+    """Test that delivered rows are deleted once past the retention window."""
+    responses.add(responses.POST, "https://api.example.com/api/orders", status=201)
+    
+    outbox = sniper.open_outbox(str(tmp_path / "outbox.db"), retention=0)
+    outbox.post("/api/orders", json={"n": 1})
+    assert outbox.flush(timeout=5)
+    outbox.close()
+    
+    reopened = sniper.open_outbox(str(tmp_path / "outbox.db"), start=False)
+    assert reopened.stats() == {}
+    reopened.close()
+
+def test_open_outbox_after_close(sniper, tmp_path):
+    """Test that a closed outbox is replaced and a second path is rejected."""
+    first = sniper.open_outbox(str(tmp_path / "first.db"), start=False)
+    with pytest.raises(ConfigError):
+        sniper.open_outbox(str(tmp_path / "second.db"))
+    first.close()
+    
+    second = sniper.open_outbox(str(tmp_path / "second.db"), start=False)
+    assert second is not first
+    second.post("/api/orders", json={"n": 1})
+    assert second.stats() == {"pending": 1}
+    second.close()
+
+@responses.activate
+def test_outbox_worker_survives_unexpected_error(sniper, tmp_path):
+    """Test that an unexpected worker error requeues the batch instead of stalling it."""
+    responses.add(
+        responses.POST, "https://api.example.com/api/orders", body=ValueError("boom")
+    )
+    responses.add(responses.POST, "https://api.example.com/api/orders", status=201)
+    
+    outbox = sniper.open_outbox(str(tmp_path / "outbox.db"), workers=1, poll_interval=0.05)
+    key = outbox.post("/api/orders", json={"n": 1})
+    
+    assert outbox.flush(timeout=5)
+    assert outbox.stats() == {"done": 1}
+    outbox.close()
+    
+    assert [call.request.headers["Idempotency-Key"] for call in responses.calls] == [key, key]
+
+@responses.activate
+def test_outbox_redelivers_after_long_outage(sniper, tmp_path):
+    """Test that transient failures keep retrying with capped backoff until delivery."""
+    for _ in range(8):
+        responses.add(responses.POST, "https://api.example.com/api/orders", status=503)
+    responses.add(responses.POST, "https://api.example.com/api/orders", status=201)
+    
+    outbox = sniper.open_outbox(
+        str(tmp_path / "outbox.db"),
+        workers=1,
+        retry_backoff=0.01,
+        max_backoff=0.02,
+        poll_interval=0.01
+    )
+    outbox.post("/api/orders", json={"n": 1})
+    
+    assert outbox.flush(timeout=5)
+    assert outbox.stats() == {"done": 1}
+    outbox.close()
+    
+    assert len(responses.calls) == 9
+
+@responses.activate
+def test_outbox_redrives_failed_writes(sniper, tmp_path):
+    """Test that failed writes can be listed and queued again once upstream recovers."""
+    responses.add(responses.POST, "https://api.example.com/api/orders", status=503)
+    responses.add(responses.POST, "https://api.example.com/api/orders", status=503)
+    responses.add(responses.POST, "https://api.example.com/api/orders", status=201)
+    
+    outbox = sniper.open_outbox(str(tmp_path / "outbox.db"), max_retry_time=0)
+    key = outbox.post("/api/orders", json={"n": 1})
+    assert outbox.flush(timeout=5)
+    assert [write["idempotency_key"] for write in outbox.failed()] == [key]
+    
+    # Re-enqueueing the same key queues the failed write again
+    outbox.post("/api/orders", json={"n": 1}, idempotency_key=key)
+    assert outbox.flush(timeout=5)
+    assert outbox.stats() == {"failed": 1}
+    
+    assert outbox.retry_failed() == 1
+    assert outbox.flush(timeout=5)
+    assert outbox.stats() == {"done": 1}
+    assert outbox.failed() == []
+    outbox.close()
+    
+    assert len(responses.calls) == 3
+
+@responses.activate
+def test_outbox_uses_its_own_session(sniper, tmp_path, monkeypatch):
+    """Test that workers send through their own session with the caller's auth."""
+    responses.add(responses.POST, "https://api.example.com/api/orders", status=201)
+    sniper.set_token("worker_token")
+    
+    def shared_session_request(*args, **kwargs):
+        raise AssertionError("outbox worker used the caller's session")
+    
+    monkeypatch.setattr(sniper.session, "request", shared_session_request)
+    outbox = sniper.open_outbox(str(tmp_path / "outbox.db"))
+    outbox.post("/api/orders", json={"n": 1})
+    assert outbox.flush(timeout=5)
+    outbox.close()
+    
+    assert responses.calls[0].request.headers["Authorization"] == "Bearer worker_token"
+
+def test_iter_validate_array_without_items():
+    """Test that an array schema without items accepts any streamed record."""
+    records = [{"a": 1}, 2, None]
+    assert list(SchemaValidator({"type": "array"}).iter_validate(records)) == records
+
+def test_validate_response_uses_parsed_null():
+    """Test that already-parsed JSON null is validated without decoding again."""
+    class NullResponse:
+        status_code = 200
+        
+        def json(self):
+            raise AssertionError("body decoded twice")
+    
+    ResponseProcessor.validate_response(NullResponse(), data=None, schema={"type": "null"})
+
+def test_stream_wraps_network_errors():
+    """Test that a connection dropped mid-stream surfaces as RequestError."""
+    class BrokenResponse:
+        def iter_lines(self):
+            yield b'{"id": 1}'
+            raise requests.exceptions.ChunkedEncodingError("connection reset")
+    
+    seen = []
+    with pytest.raises(RequestError, match="connection reset"):
+        for record in ResponseProcessor.iter_json_lines(BrokenResponse()):
+            seen.append(record)
+    assert seen == [{"id": 1}]
+
+def test_schema_rejects_unsupported_keywords():
+    """Test that validation keywords outside the supported subset are not ignored."""
+    with pytest.raises(ValueError, match="enum, minimum"):
+        SchemaValidator({"type": "integer", "enum": [1, 2], "minimum": 1})
+    with pytest.raises(ValueError, match=r"\$ref"):
+        SchemaValidator({"type": "object", "properties": {"a": {"$ref": "#/defs/a"}}})
+    
+    # Annotations are accepted
+    SchemaValidator({"type": "integer", "title": "Count", "description": "How many"})
+
+@responses.activate
+def test_schema_mutated_after_first_use(sniper):
+    """Test that editing a schema dict after first use takes effect."""
+    responses.add(responses.POST, "https://api.example.com/api/users", json={"id": 1}, status=201)
+    schema = {"type": "object", "required": ["id"]}
+    
+    assert sniper.post("/api/users", json={}, schema=schema) == {"id": 1}
+    
+    schema["required"].append("name")
+    with pytest.raises(ValidationError, match="missing required fields: name"):
+        sniper.post("/api/users", json={}, schema=schema)
+
+@responses.activate
+def test_stream_closes_failed_responses(sniper, monkeypatch):
+    """Test that every failed streaming attempt releases its connection."""
+    monkeypatch.setattr("api_sniper.request_handler.time.sleep", lambda seconds: None)
+    responses.add(responses.GET, "https://api.example.com/api/events", status=503)
+    
+    closed = []
+    close = requests.Response.close
+    
+    def tracking_close(response):
+        closed.append(response.status_code)
+        close(response)
+    
+    monkeypatch.setattr(requests.Response, "close", tracking_close)
+    
+    with pytest.raises(RequestError):
+        list(sniper.stream("/api/events"))
+    assert closed == [503, 503, 503]